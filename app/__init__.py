@@ -1,10 +1,34 @@
+import orjson
+import redis
 from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from flask_session import Session
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.engine import make_url
+from werkzeug.middleware.proxy_fix import ProxyFix
 
 db = SQLAlchemy()
 
 
-def create_app():
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider that parses requests and encodes responses with orjson"""
+
+    def _dumps(self, obj):
+        option = orjson.OPT_SORT_KEYS if self.sort_keys else 0
+        return orjson.dumps(obj, default=self.default, option=option)
+
+    def dumps(self, obj, **kwargs):
+        return self._dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self._dumps(obj), mimetype=self.mimetype)
+
+
+def create_app(test_config=None):
     import os
     base_dir = os.path.abspath(os.path.dirname(__file__))
     template_dir = os.path.join(os.path.dirname(base_dir), 'templates')
@@ -13,12 +37,67 @@ def create_app():
     app = Flask(__name__,
                 template_folder=template_dir,
                 static_folder=static_dir)
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///tasks.db'
+    app.json = OrjsonProvider(app)
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///tasks.db')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        'pool_pre_ping': True,
+        'pool_recycle': 1800
+    }
     app.config['SECRET_KEY'] = 'your-secret-key-change-in-production'
+    app.config['PASSWORD_HASH_METHOD'] = 'scrypt'
+    app.config['REDIS_URL'] = os.environ.get('REDIS_URL')
+    app.config['STATS_CACHE_TTL'] = 60
+    # Failed-login limits per window: one client and username, one client
+    # across all usernames, and one username across all clients (that last
+    # one only refuses clients that have already failed for the username)
+    app.config['LOGIN_MAX_ATTEMPTS'] = 10
+    app.config['LOGIN_MAX_ATTEMPTS_PER_IP'] = 100
+    app.config['LOGIN_MAX_ATTEMPTS_PER_USERNAME'] = 50
+    app.config['LOGIN_ATTEMPT_WINDOW'] = 60
+    # Number of reverse proxies in front of the app whose X-Forwarded-For is
+    # trusted; the login limits key on the client address it yields
+    app.config['TRUSTED_PROXIES'] = int(os.environ.get('TRUSTED_PROXIES', '0'))
+
+    if test_config:
+        app.config.update(test_config)
+        # Password hashing is deliberately slow; testing setups get a single
+        # PBKDF2 round unless they pick a method themselves
+        if app.config['TESTING'] and 'PASSWORD_HASH_METHOD' not in test_config:
+            app.config['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:1'
+
+    # A bare postgres:// or postgresql:// URL is pinned to psycopg2, the driver
+    # in requirements.txt that gunicorn.conf.py patches for gevent; newer
+    # SQLAlchemy releases would otherwise pick psycopg 3
+    database_url = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    if database_url.drivername in ('postgres', 'postgresql'):
+        database_url = database_url.set(drivername='postgresql+psycopg2')
+        app.config['SQLALCHEMY_DATABASE_URI'] = database_url.render_as_string(hide_password=False)
+
+    # QueuePool sizing only applies to server databases; SQLite keeps the pool
+    # Flask-SQLAlchemy picks for it (StaticPool for in-memory databases).
+    # Each process can open up to pool_size + max_overflow (60) connections;
+    # keep that times the number of workers below the server's max_connections
+    if database_url.get_backend_name() != 'sqlite':
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+            'pool_size': 20,
+            'max_overflow': 40,
+            **app.config['SQLALCHEMY_ENGINE_OPTIONS']
+        }
+
+    if app.config['TRUSTED_PROXIES']:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['TRUSTED_PROXIES'])
 
     db.init_app(app)
 
+    # Redis is optional; without REDIS_URL the app runs uncached and
+    # keeps sessions in signed cookies
+    if app.config['REDIS_URL']:
+        app.extensions['redis'] = redis.Redis.from_url(app.config['REDIS_URL'])
+        app.config['SESSION_TYPE'] = 'redis'
+        app.config['SESSION_REDIS'] = app.extensions['redis']
+        Session(app)
+
     from app.routes import main
     app.register_blueprint(main)
 
@@ -1,5 +1,7 @@
+from flask import current_app
 from app import db
 from datetime import datetime
+from sqlalchemy import DDL, column, event, table
 from werkzeug.security import generate_password_hash, check_password_hash
 
 
@@ -13,7 +15,7 @@ class User(db.Model):
     categories = db.relationship('Category', backref='owner', lazy=True, cascade='all, delete-orphan')
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = generate_password_hash(password, method=current_app.config['PASSWORD_HASH_METHOD'])
 
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
@@ -27,14 +29,14 @@ class Category(db.Model):
     name = db.Column(db.String(50), nullable=False)
     color = db.Column(db.String(7), default='#6c757d')
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    tasks = db.relationship('Task', backref='category', lazy=True)
+    tasks = db.relationship('Task', back_populates='category', lazy=True)
 
-    def to_dict(self):
+    def to_dict(self, task_count=None):
         return {
             'id': self.id,
             'name': self.name,
             'color': self.color,
-            'task_count': len(self.tasks)
+            'task_count': len(self.tasks) if task_count is None else task_count
         }
 
     def __repr__(self):
@@ -42,6 +44,14 @@ class Category(db.Model):
 
 
 class Task(db.Model):
+    __table_args__ = (
+        db.Index('ix_task_user_created', 'user_id', 'created_at'),
+        db.Index('ix_task_user_status', 'user_id', 'status'),
+        db.Index('ix_task_user_priority_status', 'user_id', 'priority', 'status'),
+        db.Index('ix_task_user_due', 'user_id', 'due_date'),
+        db.Index('ix_task_user_category', 'user_id', 'category_id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text, nullable=True)
@@ -52,8 +62,11 @@ class Task(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    category = db.relationship('Category', back_populates='tasks')
 
-    def to_dict(self):
+    def to_dict(self, now=None):
+        if now is None:
+            now = datetime.utcnow()
         return {
             'id': self.id,
             'title': self.title,
@@ -64,10 +77,69 @@ class Task(db.Model):
             'category_id': self.category_id,
             'category_name': self.category.name if self.category else None,
             'category_color': self.category.color if self.category else None,
-            'is_overdue': self.due_date < datetime.utcnow() if self.due_date else False,
+            'is_overdue': self.due_date < now if self.due_date else False,
             'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S'),
             'updated_at': self.updated_at.strftime('%Y-%m-%d %H:%M:%S')
         }
 
     def __repr__(self):
-        return f'<Task {self.title}>'
\ No newline at end of file
+        return f'<Task {self.title}>'
+
+
+# Full-text index over task titles and descriptions (SQLite FTS5). The
+# virtual table is kept in sync with the task table by triggers and is
+# not part of the ORM metadata, so it is exposed as a lightweight table.
+task_fts = table('task_fts', column('rowid'), column('task_fts'))
+
+TASK_FTS_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS task_fts USING fts5("
+    "title, description, content='task', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS task_fts_ai AFTER INSERT ON task BEGIN "
+    "INSERT INTO task_fts(rowid, title, description) "
+    "VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS task_fts_ad AFTER DELETE ON task BEGIN "
+    "INSERT INTO task_fts(task_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS task_fts_au AFTER UPDATE OF title, description ON task BEGIN "
+    "INSERT INTO task_fts(task_fts, rowid, title, description) "
+    "VALUES ('delete', old.id, old.title, old.description); "
+    "INSERT INTO task_fts(rowid, title, description) "
+    "VALUES (new.id, new.title, new.description); END",
+)
+
+
+# PostgreSQL keeps the same index as a generated tsvector column on the task
+# table with a GIN index over it; the column is filled for existing rows when
+# it is added and maintained by the database afterwards, so no triggers.
+task_search = table('task', column('id'), column('search_vector'))
+
+TASK_SEARCH_VECTOR_DDL = (
+    "ALTER TABLE task ADD COLUMN IF NOT EXISTS search_vector tsvector "
+    "GENERATED ALWAYS AS (to_tsvector('english', "
+    "coalesce(title, '') || ' ' || coalesce(description, ''))) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_task_search_vector ON task USING gin (search_vector)",
+)
+
+
+@event.listens_for(db.metadata, 'after_create')
+def create_task_fts(target, connection, **kw):
+    # Runs on every create_all(), including the one at startup, so databases
+    # whose task table predates the index get it too. A newly created index
+    # is rebuilt from the rows already in the task table.
+    if connection.dialect.name == 'postgresql':
+        for statement in TASK_SEARCH_VECTOR_DDL:
+            connection.exec_driver_sql(statement)
+        return
+    if connection.dialect.name != 'sqlite':
+        return
+    existed = connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'task_fts'"
+    ).first() is not None
+    for statement in TASK_FTS_DDL:
+        connection.exec_driver_sql(statement)
+    if not existed:
+        connection.exec_driver_sql("INSERT INTO task_fts(task_fts) VALUES ('rebuild')")
+
+
+event.listen(Task.__table__, 'before_drop',
+             DDL('DROP TABLE IF EXISTS task_fts').execute_if(dialect='sqlite'))
@@ -1,27 +1,214 @@
 
-from flask import Blueprint, render_template, request, jsonify, session, redirect, url_for
+from flask import (Blueprint, current_app, g, render_template, request, jsonify, session, redirect,
+                   stream_with_context, url_for)
 from functools import wraps
+from itertools import chain
 from app import db
-from app.models import Task, User, Category
-from datetime import datetime
+from app.models import Task, User, Category, task_fts, task_search
+from datetime import date, datetime, time
+from time import perf_counter
+from sqlalchemy import and_, case, func, insert, lambda_stmt, select, tuple_
+from sqlalchemy.exc import IntegrityError
+from werkzeug.security import check_password_hash
 
 main = Blueprint('main', __name__)
 
+DEFAULT_CATEGORIES = [
+    ('Work', '#0d6efd'),
+    ('Personal', '#198754'),
+    ('Shopping', '#ffc107'),
+    ('Health', '#dc3545')
+]
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+MAX_BULK_TASKS = 200
+
+# Unpaginated task lists longer than STREAM_MIN_ROWS are streamed in
+# batches that start small and grow; shorter ones are returned in one piece
+STREAM_MIN_ROWS = 500
+STREAM_YIELD_PER = 200
+STREAM_BATCH_MIN = 50
+STREAM_BATCH_MAX = 1000
+STREAM_FLUSH_INTERVAL = 0.05
+
+# Columns selected by the task list; rows come back as plain tuples, so the
+# list endpoint skips ORM hydration and the identity map entirely
+TASK_LIST_COLUMNS = (
+    Task.id, Task.title, Task.description, Task.status, Task.priority,
+    Task.due_date, Task.category_id,
+    Category.name.label('category_name'), Category.color.label('category_color'),
+    Task.created_at, Task.updated_at
+)
+
+
+@main.before_request
+def load_user_id():
+    # Read the session once per request; views and login_required use g
+    g.user_id = session.get('user_id')
+
 
 def login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
+        if g.user_id is None:
             return jsonify({'error': 'Authentication required'}), 401
         return f(*args, **kwargs)
 
     return decorated_function
 
 
+def get_cache():
+    return current_app.extensions.get('redis')
+
+
+def stats_cache_key(user_id):
+    return f'stats:{user_id}'
+
+
+def invalidate_stats(user_id):
+    cache = get_cache()
+    if cache is not None:
+        cache.delete(stats_cache_key(user_id))
+
+
+def unique_violation_target(error):
+    # Name the constraint or column behind a UNIQUE violation without looking
+    # at the rest of the driver message, which can echo the rejected value
+    diag = getattr(error.orig, 'diag', None)
+    if getattr(diag, 'constraint_name', None):
+        return diag.constraint_name  # PostgreSQL, e.g. user_email_key
+    message = str(error.orig)
+    prefix = 'UNIQUE constraint failed: '
+    if message.startswith(prefix):
+        return message[len(prefix):]  # SQLite, e.g. user.email
+    return ''
+
+
+def login_attempt_keys(username):
+    # Failed-login counters for this client and username, this client across
+    # all usernames, and this username across all clients
+    ip = request.remote_addr
+    return f'login:{ip}:{username}', f'login:ip:{ip}', f'login:user:{username}'
+
+
+def login_throttled(cache, keys):
+    # Read-only check made before paying for the password hash
+    config = current_app.config
+    pair, per_ip, per_username = (int(count or 0) for count in cache.mget(keys))
+    if pair >= config['LOGIN_MAX_ATTEMPTS'] or per_ip >= config['LOGIN_MAX_ATTEMPTS_PER_IP']:
+        return True
+    # The cross-client username counter only stops clients that have already
+    # failed against this username, so strangers cannot lock the owner out
+    return per_username >= config['LOGIN_MAX_ATTEMPTS_PER_USERNAME'] and pair > 0
+
+
+def record_failed_login(cache, keys):
+    # SET NX EX starts each window with its TTL inside the same MULTI as the
+    # INCR, so a counter can never be left without an expiry
+    window = current_app.config['LOGIN_ATTEMPT_WINDOW']
+    pipe = cache.pipeline()
+    for key in keys:
+        pipe.set(key, 0, ex=window, nx=True)
+        pipe.incr(key)
+    pipe.execute()
+
+
+def task_row_to_dict(row, now):
+    # Same shape as Task.to_dict(), built from a TASK_LIST_COLUMNS row
+    return {
+        'id': row.id,
+        'title': row.title,
+        'description': row.description,
+        'status': row.status,
+        'priority': row.priority,
+        'due_date': row.due_date.strftime('%Y-%m-%d') if row.due_date else None,
+        'category_id': row.category_id,
+        'category_name': row.category_name,
+        'category_color': row.category_color,
+        'is_overdue': row.due_date < now if row.due_date else False,
+        'created_at': row.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+        'updated_at': row.updated_at.strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+
+def stream_task_rows(result, first_rows, now):
+    # Emit the JSON array in batches so the first rows go out before the
+    # whole list is fetched. Batches double while they fill quickly, which
+    # keeps time-to-first-byte low without flushing tiny chunks forever.
+    batch_size = STREAM_BATCH_MIN
+    batch = []
+    prefix = b'['
+    last_flush = perf_counter()
+    # Encode rows with the app's provider so they match jsonify (sorted keys)
+    dumps = current_app.json._dumps
+    try:
+        for row in chain(first_rows, result):
+            batch.append(dumps(task_row_to_dict(row, now)))
+            if len(batch) >= batch_size:
+                yield prefix + b','.join(batch)
+                prefix = b','
+                batch = []
+                if perf_counter() - last_flush < STREAM_FLUSH_INTERVAL:
+                    batch_size = min(batch_size * 2, STREAM_BATCH_MAX)
+                last_flush = perf_counter()
+        if batch:
+            yield prefix + b','.join(batch)
+            prefix = b','
+        yield b']' if prefix == b',' else b'[]'
+    finally:
+        # The response outlives the view, so release the connection here
+        db.session.close()
+
+
+def parse_due_date(value):
+    # date.fromisoformat is much cheaper than strptime, but from Python 3.11
+    # it also takes 20240101 and 2024-W01-1; accept only the YYYY-MM-DD shape
+    if not isinstance(value, str) or len(value) != 10 or value[4] != '-' or value[7] != '-':
+        raise ValueError('Due dates must be YYYY-MM-DD')
+    return datetime.combine(date.fromisoformat(value), time.min)
+
+
+def build_task(data, user_id):
+    """Build an unsaved task from a JSON payload; raises ValueError with the client error message"""
+    if not isinstance(data, dict) or not data.get('title'):
+        raise ValueError('Title is required')
+
+    due_date = None
+    if data.get('due_date'):
+        try:
+            due_date = parse_due_date(data['due_date'])
+        except ValueError:
+            raise ValueError('Invalid date format')
+
+    return Task(
+        title=data['title'],
+        description=data.get('description', ''),
+        status=data.get('status', 'pending'),
+        priority=data.get('priority', 'medium'),
+        category_id=data.get('category_id'),
+        due_date=due_date,
+        user_id=user_id
+    )
+
+
+def fts_query(search):
+    # Quote each term so user input is never parsed as FTS5 syntax, and
+    # prefix-match it so the start of a word still hits; unlike ILIKE, text
+    # from the middle of a word ("lph" in "alpha") does not match
+    return ' '.join('"{}"*'.format(term.replace('"', '""')) for term in search.split())
+
+
+def search_vector_match(search):
+    # PostgreSQL counterpart of the FTS5 MATCH; plainto_tsquery treats the
+    # input as plain words, stemmed, so whole words match rather than prefixes
+    return task_search.c.search_vector.op('@@')(func.plainto_tsquery('english', search))
+
+
 # Auth Routes
 @main.route('/')
 def index():
-    if 'user_id' in session:
+    if g.user_id is not None:
         return redirect(url_for('main.dashboard'))
     return render_template('login.html')
 
@@ -33,14 +220,14 @@ def register_page():
 
 @main.route('/dashboard')
 def dashboard():
-    if 'user_id' not in session:
+    if g.user_id is None:
         return redirect(url_for('main.index'))
     return render_template('dashboard.html')
 
 
 @main.route('/tasks')
 def tasks_page():
-    if 'user_id' not in session:
+    if g.user_id is None:
         return redirect(url_for('main.index'))
     return render_template('tasks.html')
 
@@ -52,29 +239,27 @@ def register():
     if not data or not data.get('username') or not data.get('email') or not data.get('password'):
         return jsonify({'error': 'All fields are required'}), 400
 
-    if User.query.filter_by(username=data['username']).first():
+    # Let the UNIQUE constraints reject duplicates instead of checking first.
+    # The row goes in with an empty hash and the password is hashed only once
+    # the insert succeeds, so duplicate signups skip the slow hash; the real
+    # hash is written in the same transaction
+    user = User(username=data['username'], email=data['email'], password_hash='')
+    db.session.add(user)
+    try:
+        db.session.flush()
+    except IntegrityError as e:
+        db.session.rollback()
+        if unique_violation_target(e) in ('user.email', 'user_email_key'):
+            return jsonify({'error': 'Email already exists'}), 400
         return jsonify({'error': 'Username already exists'}), 400
 
-    if User.query.filter_by(email=data['email']).first():
-        return jsonify({'error': 'Email already exists'}), 400
-
-    user = User(username=data['username'], email=data['email'])
     user.set_password(data['password'])
 
-    db.session.add(user)
-    db.session.commit()
-
-    # Create default categories
-    default_categories = [
-        {'name': 'Work', 'color': '#0d6efd'},
-        {'name': 'Personal', 'color': '#198754'},
-        {'name': 'Shopping', 'color': '#ffc107'},
-        {'name': 'Health', 'color': '#dc3545'}
-    ]
-
-    for cat_data in default_categories:
-        category = Category(name=cat_data['name'], color=cat_data['color'], user_id=user.id)
-        db.session.add(category)
+    # Create default categories in the same transaction as the user
+    db.session.execute(insert(Category), [
+        {'name': name, 'color': color, 'user_id': user.id}
+        for name, color in DEFAULT_CATEGORIES
+    ])
 
     db.session.commit()
 
@@ -91,11 +276,26 @@ def login():
     if not data or not data.get('username') or not data.get('password'):
         return jsonify({'error': 'Username and password are required'}), 400
 
-    user = User.query.filter_by(username=data['username']).first()
+    # Throttle repeated failures before paying for the password hash
+    cache = get_cache()
+    keys = login_attempt_keys(data['username'])
+    if cache is not None and login_throttled(cache, keys):
+        return jsonify({'error': 'Too many login attempts, try again later'}), 429
 
-    if not user or not user.check_password(data['password']):
+    user = db.session.query(
+        User.id, User.username, User.password_hash
+    ).filter_by(username=data['username']).first()
+
+    if not user or not check_password_hash(user.password_hash, data['password']):
+        if cache is not None:
+            record_failed_login(cache, keys)
         return jsonify({'error': 'Invalid username or password'}), 401
 
+    # Only the client's own counter for this username is reset; the wider
+    # counters keep counting so one success cannot clear them
+    if cache is not None:
+        cache.delete(keys[0])
+
     session['user_id'] = user.id
     session['username'] = user.username
 
@@ -112,8 +312,12 @@ def logout():
 @main.route('/api/categories', methods=['GET'])
 @login_required
 def get_categories():
-    categories = Category.query.filter_by(user_id=session['user_id']).all()
-    return jsonify([cat.to_dict() for cat in categories])
+    # Count tasks for every category in one GROUP BY instead of one
+    # lazy load per category
+    categories = db.session.query(Category, func.count(Task.id)).outerjoin(
+        Task, Task.category_id == Category.id
+    ).filter(Category.user_id == g.user_id).group_by(Category.id).order_by(Category.id).all()
+    return jsonify([cat.to_dict(task_count) for cat, task_count in categories])
 
 
 @main.route('/api/categories', methods=['POST'])
@@ -127,11 +331,12 @@ def create_category():
     category = Category(
         name=data['name'],
         color=data.get('color', '#6c757d'),
-        user_id=session['user_id']
+        user_id=g.user_id
     )
 
     db.session.add(category)
     db.session.commit()
+    invalidate_stats(g.user_id)
 
     return jsonify(category.to_dict()), 201
 
@@ -139,9 +344,10 @@ def create_category():
 @main.route('/api/categories/<int:id>', methods=['DELETE'])
 @login_required
 def delete_category(id):
-    category = Category.query.filter_by(id=id, user_id=session['user_id']).first_or_404()
+    category = Category.query.filter_by(id=id, user_id=g.user_id).first_or_404()
     db.session.delete(category)
     db.session.commit()
+    invalidate_stats(g.user_id)
     return jsonify({'message': 'Category deleted successfully'}), 200
 
 
@@ -149,80 +355,165 @@ def delete_category(id):
 @main.route('/api/tasks', methods=['GET'])
 @login_required
 def get_tasks():
-    query = Task.query.filter_by(user_id=session['user_id'])
+    now = datetime.utcnow()
+    user_id = g.user_id
+
+    # Built as a lambda statement so SQLAlchemy caches the compiled SQL per
+    # combination of filters; the closure values become bound parameters
+    stmt = lambda_stmt(lambda: select(*TASK_LIST_COLUMNS).outerjoin(
+        Category, Task.category_id == Category.id
+    ).where(Task.user_id == user_id))
 
     # Search filter
     search = request.args.get('search')
-    if search:
-        query = query.filter(
-            (Task.title.ilike(f'%{search}%')) |
-            (Task.description.ilike(f'%{search}%'))
-        )
+    if search and search.strip():
+        if db.engine.dialect.name == 'sqlite':
+            terms = fts_query(search)
+            stmt += lambda s: s.where(Task.id.in_(
+                select(task_fts.c.rowid).where(task_fts.c.task_fts.op('MATCH')(terms))
+            ))
+        elif db.engine.dialect.name == 'postgresql':
+            stmt += lambda s: s.where(Task.id.in_(
+                select(task_search.c.id).where(search_vector_match(search))
+            ))
+        else:
+            pattern = f'%{search}%'
+            stmt += lambda s: s.where(Task.title.ilike(pattern) | Task.description.ilike(pattern))
 
     # Status filter
     status = request.args.get('status')
     if status:
-        query = query.filter_by(status=status)
+        stmt += lambda s: s.where(Task.status == status)
 
     # Priority filter
     priority = request.args.get('priority')
     if priority:
-        query = query.filter_by(priority=priority)
+        stmt += lambda s: s.where(Task.priority == priority)
 
     # Category filter
     category_id = request.args.get('category_id')
     if category_id:
-        query = query.filter_by(category_id=int(category_id))
+        category_id = int(category_id)
+        stmt += lambda s: s.where(Task.category_id == category_id)
 
     # Date filter
     overdue = request.args.get('overdue')
     if overdue == 'true':
-        query = query.filter(Task.due_date < datetime.utcnow())
+        stmt += lambda s: s.where(Task.due_date < now)
+
+    stmt += lambda s: s.order_by(Task.created_at.desc(), Task.id.desc())
+
+    # Keyset pagination, opted into with ?limit= and/or ?before=<created_at>,<id>
+    limit = request.args.get('limit')
+    before = request.args.get('before')
+    if limit is None and not before:
+        # Run the query and read the first rows before the response starts,
+        # so database errors still produce a 500 instead of a cut-off 200
+        result = db.session.execute(stmt, execution_options={'yield_per': STREAM_YIELD_PER})
+        first_rows = result.fetchmany(STREAM_MIN_ROWS + 1)
+        if len(first_rows) <= STREAM_MIN_ROWS:
+            tasks = [task_row_to_dict(row, now) for row in first_rows]
+            db.session.close()
+            return jsonify(tasks)
+        return current_app.response_class(
+            stream_with_context(stream_task_rows(result, first_rows, now)),
+            mimetype='application/json'
+        )
+
+    if limit is None:
+        limit = DEFAULT_PAGE_SIZE
+    else:
+        try:
+            limit = int(limit)
+        except ValueError:
+            return jsonify({'error': 'Invalid limit'}), 400
+        if limit < 1:
+            return jsonify({'error': 'Invalid limit'}), 400
+        limit = min(limit, MAX_PAGE_SIZE)
+    if before:
+        try:
+            created_at, task_id = before.rsplit(',', 1)
+            cursor_created_at, cursor_id = datetime.fromisoformat(created_at), int(task_id)
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        stmt += lambda s: s.where(
+            tuple_(Task.created_at, Task.id) < tuple_(cursor_created_at, cursor_id)
+        )
+
+    # Fetch one extra row to know whether another page exists
+    fetch = limit + 1
+    stmt += lambda s: s.limit(fetch)
+    rows = db.session.execute(stmt).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = f'{rows[-1].created_at.isoformat()},{rows[-1].id}'
 
-    tasks = query.order_by(Task.created_at.desc()).all()
-    return jsonify([task.to_dict() for task in tasks])
+    payload = {
+        'items': [task_row_to_dict(row, now) for row in rows],
+        'next_cursor': next_cursor
+    }
+    db.session.close()
+    return jsonify(payload)
 
 
 @main.route('/api/tasks/<int:id>', methods=['GET'])
 @login_required
 def get_task(id):
-    task = Task.query.filter_by(id=id, user_id=session['user_id']).first_or_404()
+    task = Task.query.filter_by(id=id, user_id=g.user_id).first_or_404()
     return jsonify(task.to_dict())
 
 
 @main.route('/api/tasks', methods=['POST'])
 @login_required
 def create_task():
-    data = request.get_json()
+    try:
+        task = build_task(request.get_json(), g.user_id)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
-    if not data or not data.get('title'):
-        return jsonify({'error': 'Title is required'}), 400
+    db.session.add(task)
+    db.session.commit()
+    invalidate_stats(g.user_id)
 
-    task = Task(
-        title=data['title'],
-        description=data.get('description', ''),
-        status=data.get('status', 'pending'),
-        priority=data.get('priority', 'medium'),
-        category_id=data.get('category_id'),
-        user_id=session['user_id']
-    )
+    return jsonify(task.to_dict()), 201, {'Location': url_for('main.get_task', id=task.id)}
 
-    if data.get('due_date'):
-        try:
-            task.due_date = datetime.strptime(data['due_date'], '%Y-%m-%d')
-        except ValueError:
-            return jsonify({'error': 'Invalid date format'}), 400
 
-    db.session.add(task)
+@main.route('/api/tasks/bulk', methods=['POST'])
+@login_required
+def create_tasks_bulk():
+    data = request.get_json()
+    items = data.get('tasks') if isinstance(data, dict) else None
+
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'A non-empty list of tasks is required'}), 400
+    if len(items) > MAX_BULK_TASKS:
+        return jsonify({'error': 'At most %d tasks can be created at once' % MAX_BULK_TASKS}), 400
+
+    # Validate every task before writing any, so a bad item creates nothing
+    tasks = []
+    for i, item in enumerate(items):
+        try:
+            tasks.append(build_task(item, g.user_id))
+        except ValueError as e:
+            return jsonify({'error': 'Task %d: %s' % (i, e)}), 400
+
+    # Build the payload between flush and commit; after the commit every
+    # task would be expired and reload its row one SELECT at a time
+    db.session.add_all(tasks)
+    db.session.flush()
+    now = datetime.utcnow()
+    payload = [task.to_dict(now) for task in tasks]
     db.session.commit()
+    invalidate_stats(g.user_id)
 
-    return jsonify(task.to_dict()), 201
+    return jsonify(payload), 201
 
 
 @main.route('/api/tasks/<int:id>', methods=['PUT'])
 @login_required
 def update_task(id):
-    task = Task.query.filter_by(id=id, user_id=session['user_id']).first_or_404()
+    task = Task.query.filter_by(id=id, user_id=g.user_id).first_or_404()
     data = request.get_json()
 
     if 'title' in data:
@@ -238,13 +529,14 @@ def update_task(id):
     if 'due_date' in data:
         if data['due_date']:
             try:
-                task.due_date = datetime.strptime(data['due_date'], '%Y-%m-%d')
+                task.due_date = parse_due_date(data['due_date'])
             except ValueError:
                 return jsonify({'error': 'Invalid date format'}), 400
         else:
             task.due_date = None
 
     db.session.commit()
+    invalidate_stats(g.user_id)
 
     return jsonify(task.to_dict())
 
@@ -252,9 +544,10 @@ def update_task(id):
 @main.route('/api/tasks/<int:id>', methods=['DELETE'])
 @login_required
 def delete_task(id):
-    task = Task.query.filter_by(id=id, user_id=session['user_id']).first_or_404()
+    task = Task.query.filter_by(id=id, user_id=g.user_id).first_or_404()
     db.session.delete(task)
     db.session.commit()
+    invalidate_stats(g.user_id)
 
     return jsonify({'message': 'Task deleted successfully'}), 200
 
@@ -263,36 +556,52 @@ def delete_task(id):
 @main.route('/api/stats', methods=['GET'])
 @login_required
 def get_stats():
-    user_id = session['user_id']
-
-    total_tasks = Task.query.filter_by(user_id=user_id).count()
-    completed = Task.query.filter_by(user_id=user_id, status='completed').count()
-    pending = Task.query.filter_by(user_id=user_id, status='pending').count()
-    in_progress = Task.query.filter_by(user_id=user_id, status='in-progress').count()
-
-    overdue = Task.query.filter(
-        Task.user_id == user_id,
-        Task.due_date < datetime.utcnow(),
-        Task.status != 'completed'
-    ).count()
-
-    high_priority = Task.query.filter_by(user_id=user_id, priority='high', status='pending').count()
+    user_id = g.user_id
+    now = datetime.utcnow()
+
+    cache = get_cache()
+    if cache is not None:
+        cached = cache.get(stats_cache_key(user_id))
+        if cached is not None:
+            return current_app.response_class(cached, mimetype='application/json')
+
+    # Status, overdue and priority buckets in a single aggregate query
+    total_tasks, completed, pending, in_progress, overdue, high_priority = db.session.query(
+        func.count(Task.id),
+        func.sum(case((Task.status == 'completed', 1), else_=0)),
+        func.sum(case((Task.status == 'pending', 1), else_=0)),
+        func.sum(case((Task.status == 'in-progress', 1), else_=0)),
+        func.sum(case((and_(Task.due_date < now, Task.status != 'completed'), 1), else_=0)),
+        func.sum(case((and_(Task.priority == 'high', Task.status == 'pending'), 1), else_=0))
+    ).filter(Task.user_id == user_id).one()
+
+    # SUM() over an empty set is NULL
+    completed = completed or 0
+    pending = pending or 0
+    in_progress = in_progress or 0
+    overdue = overdue or 0
+    high_priority = high_priority or 0
 
     completion_rate = (completed / total_tasks * 100) if total_tasks > 0 else 0
 
     # Tasks by category
-    categories = Category.query.filter_by(user_id=user_id).all()
-    tasks_by_category = []
-    for cat in categories:
-        count = Task.query.filter_by(user_id=user_id, category_id=cat.id).count()
-        if count > 0:
-            tasks_by_category.append({
-                'name': cat.name,
-                'count': count,
-                'color': cat.color
-            })
-
-    return jsonify({
+    category_counts = db.session.query(
+        Category.name, Category.color, func.count(Task.id)
+    ).outerjoin(
+        Task, and_(Task.category_id == Category.id, Task.user_id == user_id)
+    ).filter(
+        Category.user_id == user_id
+    ).group_by(Category.id).having(func.count(Task.id) > 0).order_by(Category.id).all()
+
+    # All data is fetched; release the connection before building the response
+    db.session.close()
+
+    tasks_by_category = [
+        {'name': name, 'count': count, 'color': color}
+        for name, color, count in category_counts
+    ]
+
+    stats = {
         'total_tasks': total_tasks,
         'completed': completed,
         'pending': pending,
@@ -301,6 +610,12 @@ def get_stats():
         'high_priority': high_priority,
         'completion_rate': round(completion_rate, 1),
         'tasks_by_category': tasks_by_category
-    })
+    }
+
+    if cache is not None:
+        cache.setex(stats_cache_key(user_id), current_app.config['STATS_CACHE_TTL'],
+                    current_app.json.dumps(stats))
+
+    return jsonify(stats)
 
 
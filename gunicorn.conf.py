@@ -0,0 +1,20 @@
+import os
+
+wsgi_app = 'run:app'
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+# Cooperative workers: a request waiting on the database yields to other
+# requests instead of blocking the whole worker
+worker_class = 'gevent'
+workers = int(os.environ.get('WEB_CONCURRENCY', '4'))
+worker_connections = 100
+
+
+def post_fork(server, worker):
+    # psycopg2 only yields to gevent once patched; installs without the
+    # PostgreSQL driver skip this
+    try:
+        from psycogreen.gevent import patch_psycopg
+    except ImportError:
+        return
+    patch_psycopg()
@@ -0,0 +1,18 @@
+"""
+Shared pytest configuration for the task management test suite
+File: tests/conftest.py
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+def pytest_configure(config):
+    """Import the app and build it once so each worker pays the import cost before collection"""
+    from app import create_app
+
+    # Pin an in-memory database so DATABASE_URL from the environment is never
+    # used, even for a dialect whose driver is not installed here
+    create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'REDIS_URL': None})
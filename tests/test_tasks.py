@@ -6,98 +6,351 @@ Tests the JSON API endpoints with session-based authentication
 """
 
 import pytest
-import json
+import logging
+import orjson
 from datetime import datetime, timedelta
-import sys
-import os
-
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from functools import lru_cache
+from itertools import product
+from sqlalchemy import event, func, insert, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.pool import StaticPool
+from werkzeug.middleware.proxy_fix import ProxyFix
 
 from app import create_app, db
-from app.models import User, Task, Category
+from app.models import User, Task, Category, task_fts, task_search
+from app.routes import DEFAULT_CATEGORIES, STREAM_MIN_ROWS, search_vector_match, unique_violation_target
+
+
+TASKS_URL = '/api/tasks'
+TASKS_BULK_URL = '/api/tasks/bulk'
+STATS_URL = '/api/stats'
+CATEGORIES_URL = '/api/categories'
+
+
+def task_url(task_id):
+    return '/api/tasks/%d' % task_id
+
+
+def category_url(category_id):
+    return '/api/categories/%d' % category_id
+
+
+# Fixed for the whole session so the base payload can be encoded once
+_FIXED_DUE = (datetime.now() + timedelta(days=7)).strftime('%Y-%m-%d')
+
+_BASE_TASK = {
+    'title': 'Test Task',
+    'description': 'This is a test task description',
+    'status': 'pending',
+    'priority': 'high',
+    'due_date': _FIXED_DUE
+}
+_BASE_TASK_JSON = orjson.dumps(_BASE_TASK)
+
+
+def post_task(client, **overrides):
+    """Create a task through the API, reusing the encoded base payload when possible"""
+    body = orjson.dumps({**_BASE_TASK, **overrides}) if overrides else _BASE_TASK_JSON
+    return client.post(TASKS_URL, data=body, content_type='application/json')
+
+
+class FakeRedis(dict):
+    """Minimal in-process stand-in for the Redis commands the app uses"""
+
+    def __init__(self):
+        super().__init__()
+        self.ttls = {}
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and key in self:
+            return None
+        self[key] = value
+        if ex is not None:
+            self.ttls[key] = ex
+        return True
+
+    def setex(self, key, ttl, value):
+        self.set(key, value, ex=ttl)
+
+    def mget(self, keys):
+        return [self.get(key) for key in keys]
+
+    def incr(self, key):
+        self[key] = int(self.get(key, 0)) + 1
+        return self[key]
+
+    def delete(self, key):
+        self.pop(key, None)
+        self.ttls.pop(key, None)
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    """Queues FakeRedis calls and runs them on execute(), like a MULTI block"""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        return [getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.calls]
 
 
 # ============================================================================
 # PYTEST FIXTURES
 # ============================================================================
 
-@pytest.fixture
-def app():
-    """Create and configure a test Flask application instance"""
-    app = create_app()
-    app.config.update({
-        'TESTING': True,
-        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
-        'WTF_CSRF_ENABLED': False,
-        'SECRET_KEY': 'test-secret-key',
-        'SQLALCHEMY_TRACK_MODIFICATIONS': False
+logging.getLogger('sqlalchemy.engine').setLevel(logging.WARNING)
+logging.getLogger('werkzeug').disabled = True
+
+TEST_CONFIG = (
+    ('TESTING', True),
+    ('WTF_CSRF_ENABLED', False),
+    ('SECRET_KEY', 'test-secret-key'),
+    ('SQLALCHEMY_TRACK_MODIFICATIONS', False),
+    ('SQLALCHEMY_ECHO', False),
+    # Never pick up a Redis server from the environment; tests that need the
+    # cache install a FakeRedis themselves
+    ('REDIS_URL', None),
+)
+
+
+@lru_cache(maxsize=8)
+def _build_app(config_items):
+    """Build a test application once per distinct configuration"""
+    app = create_app({
+        **dict(config_items),
+        'SQLALCHEMY_ENGINE_OPTIONS': {
+            'poolclass': StaticPool,
+            'connect_args': {'check_same_thread': False, 'uri': True}
+        }
     })
+    app.logger.disabled = True
 
     with app.app_context():
-        db.create_all()
-        yield app
-        db.session.remove()
-        db.drop_all()
+        # pysqlite defers BEGIN until the first write, which breaks SAVEPOINT
+        # handling; take over transaction control so rollbacks are real
+        @event.listens_for(db.engine, 'connect')
+        def configure_sqlite_connection(dbapi_connection, connection_record):
+            dbapi_connection.isolation_level = None
+            # The database is thrown away after the run, so skip durability work
+            cursor = dbapi_connection.cursor()
+            cursor.execute('PRAGMA synchronous=OFF')
+            cursor.execute('PRAGMA journal_mode=MEMORY')
+            cursor.execute('PRAGMA temp_store=MEMORY')
+            cursor.close()
+
+        @event.listens_for(db.engine, 'begin')
+        def emit_begin(connection):
+            connection.exec_driver_sql('BEGIN')
+
+    return app
+
+
+@pytest.fixture(scope='session')
+def app(worker_id):
+    """Create the test application and its schema once per session.
+
+    One application context stays pushed for the whole session, so fixtures
+    and tests use db.session and the models without pushing their own.
+    """
+    # Each pytest-xdist worker gets its own named shared-cache database,
+    # which outlives any single connection; worker_id is 'master' when serial
+    database_uri = f'sqlite:///file:tasks_test_{worker_id}?mode=memory&cache=shared&uri=true'
+    app = _build_app(TEST_CONFIG + (('SQLALCHEMY_DATABASE_URI', database_uri),))
+
+    ctx = app.app_context()
+    ctx.push()
+    db.create_all()
+
+    yield app
+
+    db.session.remove()
+    db.drop_all()
+
+    # Close pooled connections now rather than whenever the engines are collected
+    for engine in db.engines.values():
+        engine.dispose()
+    ctx.pop()
 
 
 @pytest.fixture
-def client(app):
-    """Create a test client for the Flask application"""
+def db_session(app):
+    """Run the test inside a transaction that is rolled back afterwards"""
+    connection = db.engine.connect()
+    transaction = connection.begin()
+    # Commits made by the app only release a SAVEPOINT inside the outer
+    # transaction, so everything a test writes disappears on rollback
+    # Objects are not expired on commit; tests accept possibly stale
+    # attributes in exchange for skipping the reload SELECT
+    session = scoped_session(sessionmaker(
+        bind=connection,
+        join_transaction_mode='create_savepoint',
+        expire_on_commit=False
+    ))
+    app_session = db.session
+    db.session = session
+
+    yield session
+
+    db.session = app_session
+    session.remove()
+    transaction.rollback()
+    connection.close()
+
+
+@pytest.fixture(scope='session')
+def shared_client(app):
+    """One test client for the whole session"""
     return app.test_client()
 
 
 @pytest.fixture
+def client(app, shared_client, db_session):
+    """Hand out the shared test client, signed out"""
+    shared_client.delete_cookie(app.config['SESSION_COOKIE_NAME'])
+    return shared_client
+
+
+@pytest.fixture(scope='session')
 def auth_user(app):
-    """Create a test user"""
-    with app.app_context():
+    """Create the test user once per session.
+
+    Session-scoped fixtures are set up before db_session, so the user is
+    committed for real and survives the per-test rollbacks.
+    """
+    user = User.query.filter_by(username='testuser').first()
+    if user is None:
         user = User(username='testuser', email='test@example.com')
         user.set_password('testpassword123')
         db.session.add(user)
         db.session.commit()
-        user_id = user.id
+    user_id = user.id
+    # The shared app context never tears down, so release the connection here
+    db.session.remove()
     return user_id
 
 
-@pytest.fixture
-def authenticated_client(client, auth_user):
-    """Create an authenticated client session"""
-    # Login via API
-    response = client.post('/api/login',
-        data=json.dumps({
+@pytest.fixture(scope='session')
+def auth_cookie(app, auth_user):
+    """Log the test user in once per session and keep the signed session cookie"""
+    login_client = app.test_client()
+    response = login_client.post('/api/login',
+        json={
             'username': 'testuser',
             'password': 'testpassword123'
-        }),
-        content_type='application/json'
+        }
     )
     assert response.status_code == 200
+    db.session.remove()
+    return login_client.get_cookie(app.config['SESSION_COOKIE_NAME']).value
+
+
+@pytest.fixture
+def user_factory(db_session):
+    """Create users inside the test transaction; the password defaults to 'password123'"""
+    def make(username, password='password123'):
+        user = User(username=username, email=f'{username}@test.com')
+        user.set_password(password)
+        db.session.add(user)
+        db.session.commit()
+        return user
+
+    return make
+
+
+@pytest.fixture
+def login_as():
+    """Sign a test client in as a user by writing the session directly"""
+    def login(client, user):
+        with client.session_transaction() as sess:
+            sess['user_id'] = user.id
+            sess['username'] = user.username
+
+    return login
+
+
+@pytest.fixture
+def authenticated_client(app, client, auth_cookie):
+    """Create an authenticated client session"""
+    client.set_cookie(app.config['SESSION_COOKIE_NAME'], auth_cookie)
     return client
 
 
+@pytest.fixture(scope='session')
+def task_factory():
+    """Build task payloads from the shared base template"""
+    def build(**overrides):
+        return {**_BASE_TASK, **overrides}
+
+    return build
+
+
+@pytest.fixture
+def seed_tasks(db_session, auth_user):
+    """Insert tasks for the test user directly, in one batch and one commit.
+
+    Keyword overrides apply to every task; a list or tuple value is spread
+    across the tasks one item each. Returns the new task ids in order.
+    """
+    def make(n, **overrides):
+        rows = []
+        for i in range(n):
+            fields = {'title': f'Task {i+1}', 'user_id': auth_user}
+            for key, value in overrides.items():
+                fields[key] = value[i] if isinstance(value, (list, tuple)) else value
+            rows.append(fields)
+        db.session.bulk_insert_mappings(Task, rows, return_defaults=True)
+        db.session.commit()
+        return [row['id'] for row in rows]
+
+    return make
+
+
 @pytest.fixture
-def sample_task_data():
-    """Sample task data for testing"""
-    return {
-        'title': 'Test Task',
-        'description': 'This is a test task description',
-        'status': 'pending',
-        'priority': 'high',
-        'due_date': (datetime.now() + timedelta(days=7)).strftime('%Y-%m-%d')
-    }
+def sample_task_id(db_session, auth_user):
+    """Insert one task with the base fields for the test user and return its id"""
+    task = Task(
+        title=_BASE_TASK['title'],
+        description=_BASE_TASK['description'],
+        status=_BASE_TASK['status'],
+        priority=_BASE_TASK['priority'],
+        user_id=auth_user
+    )
+    db.session.add(task)
+    db.session.commit()
+    return task.id
 
 
 @pytest.fixture
-def sample_category(app, auth_user):
+def filter_corpus(seed_tasks):
+    """One task for every (status, priority) combination"""
+    combinations = list(product(['pending', 'in-progress', 'completed'], ['low', 'medium', 'high']))
+    seed_tasks(
+        len(combinations),
+        status=[status for status, _ in combinations],
+        priority=[priority for _, priority in combinations]
+    )
+
+
+@pytest.fixture
+def sample_category(db_session, auth_user):
     """Create a sample category"""
-    with app.app_context():
-        category = Category(
-            name='Work',
-            color='#0d6efd',
-            user_id=auth_user
-        )
-        db.session.add(category)
-        db.session.commit()
-        category_id = category.id
-    return category_id
+    result = db.session.execute(
+        insert(Category).values(name='Work', color='#0d6efd', user_id=auth_user)
+    )
+    db.session.commit()
+    return result.inserted_primary_key[0]
 
 
 # ============================================================================
@@ -107,93 +360,263 @@ def sample_category(app, auth_user):
 class TestAuthentication:
     """Test authentication endpoints"""
 
-    def test_register_success(self, client, app):
+    def test_register_success(self, client):
         """Test successful user registration"""
         response = client.post('/api/register',
-            data=json.dumps({
+            json={
                 'username': 'newuser',
                 'email': 'newuser@example.com',
                 'password': 'password123'
-            }),
-            content_type='application/json'
+            }
         )
 
         assert response.status_code == 201
-        data = json.loads(response.data)
+        data = response.get_json()
         assert data['message'] == 'Registration successful'
         assert data['username'] == 'newuser'
 
         # Verify user in database
-        with app.app_context():
-            user = User.query.filter_by(username='newuser').first()
-            assert user is not None
-            assert user.email == 'newuser@example.com'
+        user = db.session.execute(select(User).filter_by(username='newuser')).scalar_one_or_none()
+        assert user is not None
+        assert user.email == 'newuser@example.com'
+        assert user.check_password('password123')
 
     def test_register_duplicate_username(self, client, auth_user):
         """Test registration with duplicate username"""
         response = client.post('/api/register',
-            data=json.dumps({
+            json={
                 'username': 'testuser',
                 'email': 'different@example.com',
                 'password': 'password123'
-            }),
-            content_type='application/json'
+            }
         )
 
         assert response.status_code == 400
-        data = json.loads(response.data)
+        data = response.get_json()
         assert 'already exists' in data['error'].lower()
 
+    def test_register_duplicate_username_mentioning_email(self, client, user_factory):
+        """Test that a duplicate username containing 'email' is not reported as an email clash"""
+        user_factory('bob_email')
+
+        response = client.post('/api/register',
+            json={'username': 'bob_email', 'email': 'bob@example.com', 'password': 'password123'}
+        )
+
+        assert response.status_code == 400
+        assert response.get_json()['error'] == 'Username already exists'
+
+    def test_register_duplicate_skips_password_hash(self, client, auth_user, monkeypatch):
+        """Test that a rejected duplicate signup never hashes the password"""
+        hashed = []
+        monkeypatch.setattr(User, 'set_password', lambda user, password: hashed.append(password))
+
+        response = client.post('/api/register',
+            json={'username': 'testuser', 'email': 'different@example.com', 'password': 'password123'}
+        )
+
+        assert response.status_code == 400
+        assert hashed == []
+
+    def test_unique_violation_target_uses_postgres_constraint(self):
+        """Test that the PostgreSQL constraint name wins over the message text"""
+        class Diag:
+            constraint_name = 'user_username_key'
+
+        class Orig(Exception):
+            diag = Diag()
+
+        error = IntegrityError('INSERT', {}, Orig('DETAIL: Key (username)=(bob_email) already exists.'))
+
+        assert unique_violation_target(error) == 'user_username_key'
+
+    def test_register_duplicate_email(self, client, auth_user):
+        """Test registration with duplicate email"""
+        response = client.post('/api/register',
+            json={
+                'username': 'differentuser',
+                'email': 'test@example.com',
+                'password': 'password123'
+            }
+        )
+
+        assert response.status_code == 400
+        data = response.get_json()
+        assert data['error'] == 'Email already exists'
+
     def test_register_missing_fields(self, client):
         """Test registration with missing fields"""
         response = client.post('/api/register',
-            data=json.dumps({
+            json={
                 'username': 'incomplete'
-            }),
-            content_type='application/json'
+            }
         )
 
         assert response.status_code == 400
-        data = json.loads(response.data)
+        data = response.get_json()
         assert 'required' in data['error'].lower()
 
     def test_login_success(self, client, auth_user):
         """Test successful login"""
         response = client.post('/api/login',
-            data=json.dumps({
+            json={
                 'username': 'testuser',
                 'password': 'testpassword123'
-            }),
-            content_type='application/json'
+            }
         )
 
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = response.get_json()
         assert data['message'] == 'Login successful'
         assert data['username'] == 'testuser'
 
     def test_login_invalid_credentials(self, client, auth_user):
         """Test login with invalid credentials"""
         response = client.post('/api/login',
-            data=json.dumps({
+            json={
                 'username': 'testuser',
                 'password': 'wrongpassword'
-            }),
-            content_type='application/json'
+            }
         )
 
         assert response.status_code == 401
-        data = json.loads(response.data)
+        data = response.get_json()
         assert 'invalid' in data['error'].lower()
 
+    def test_login_throttled_after_repeated_failures(self, app, client, auth_user, monkeypatch):
+        """Test that repeated failed logins are rejected before hashing"""
+        cache = FakeRedis()
+        monkeypatch.setitem(app.extensions, 'redis', cache)
+        monkeypatch.setitem(app.config, 'LOGIN_MAX_ATTEMPTS', 2)
+        credentials = {'username': 'testuser', 'password': 'wrongpassword'}
+
+        for _ in range(2):
+            response = client.post('/api/login', json=credentials)
+            assert response.status_code == 401
+
+        response = client.post('/api/login', json=credentials)
+        assert response.status_code == 429
+        # Every counter was created with the window as its expiry
+        assert cache.ttls == dict.fromkeys(cache, app.config['LOGIN_ATTEMPT_WINDOW'])
+
+    def test_successful_logins_are_not_counted(self, app, client, auth_user, monkeypatch):
+        """Test that successful logins do not use up the per-IP budget"""
+        cache = FakeRedis()
+        monkeypatch.setitem(app.extensions, 'redis', cache)
+        monkeypatch.setitem(app.config, 'LOGIN_MAX_ATTEMPTS_PER_IP', 2)
+
+        for _ in range(3):
+            response = client.post('/api/login', json={'username': 'testuser', 'password': 'testpassword123'})
+            assert response.status_code == 200
+        assert cache == {}
+
+    def test_login_throttled_per_client_across_usernames(self, app, client, monkeypatch):
+        """Test that one client cycling through usernames hits the per-IP limit"""
+        monkeypatch.setitem(app.extensions, 'redis', FakeRedis())
+        monkeypatch.setitem(app.config, 'LOGIN_MAX_ATTEMPTS_PER_IP', 2)
+
+        for username in ('alice', 'bob'):
+            response = client.post('/api/login', json={'username': username, 'password': 'guess'})
+            assert response.status_code == 401
+
+        response = client.post('/api/login', json={'username': 'carol', 'password': 'guess'})
+        assert response.status_code == 429
+
+    def test_login_throttled_per_username_across_clients(self, app, client, auth_user, monkeypatch):
+        """Test that the per-username limit stops repeat guessers without locking out the owner"""
+        monkeypatch.setitem(app.extensions, 'redis', FakeRedis())
+        monkeypatch.setitem(app.config, 'LOGIN_MAX_ATTEMPTS_PER_USERNAME', 2)
+        credentials = {'username': 'testuser', 'password': 'wrongpassword'}
+
+        for ip in ('10.0.0.1', '10.0.0.2'):
+            response = client.post('/api/login', json=credentials, environ_base={'REMOTE_ADDR': ip})
+            assert response.status_code == 401
+
+        # A client that already failed for this username is refused
+        response = client.post('/api/login', json=credentials, environ_base={'REMOTE_ADDR': '10.0.0.2'})
+        assert response.status_code == 429
+
+        # The owner signing in from a fresh address still gets in
+        response = client.post('/api/login',
+            json={'username': 'testuser', 'password': 'testpassword123'},
+            environ_base={'REMOTE_ADDR': '10.0.0.3'}
+        )
+        assert response.status_code == 200
+
+    def test_trusted_proxies_enable_proxy_fix(self):
+        """Test that TRUSTED_PROXIES wraps the app so client addresses come from X-Forwarded-For"""
+        proxied_app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+                                  'REDIS_URL': None, 'TRUSTED_PROXIES': 1})
+
+        assert isinstance(proxied_app.wsgi_app, ProxyFix)
+        assert proxied_app.wsgi_app.x_for == 1
+
     def test_logout(self, authenticated_client):
         """Test logout"""
         response = authenticated_client.post('/api/logout')
 
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = response.get_json()
         assert data['message'] == 'Logout successful'
 
+    def test_testing_config_uses_cheap_password_hash(self, app, db_session, auth_user):
+        """Test that the testing setup hashes passwords with a single PBKDF2 round"""
+        assert app.config['PASSWORD_HASH_METHOD'] == 'pbkdf2:sha256:1'
+        assert db.session.get(User, auth_user).password_hash.startswith('pbkdf2:sha256:1$')
+
+
+# ============================================================================
+# PAGE TESTS
+# ============================================================================
+
+class TestPages:
+    """Test the HTML page routes without following their redirects"""
+
+    @pytest.mark.parametrize('path', ['/dashboard', '/tasks'])
+    def test_pages_redirect_without_auth(self, client, path):
+        """Test that protected pages send anonymous users to the login page"""
+        response = client.get(path)
+
+        assert response.status_code == 302
+        assert response.headers['Location'] == '/'
+
+    def test_index_redirects_when_logged_in(self, authenticated_client):
+        """Test that the login page sends signed-in users to the dashboard"""
+        response = authenticated_client.get('/')
+
+        assert response.status_code == 302
+        assert response.headers['Location'] == '/dashboard'
+
+
+# ============================================================================
+# ACCESS CONTROL TESTS
+# ============================================================================
+
+class TestAccessControl:
+    """Test the authentication and not-found checks shared by the API endpoints"""
+
+    @pytest.mark.parametrize('method,url', [
+        ('POST', TASKS_URL),
+        ('GET', TASKS_URL),
+        ('PUT', task_url(1)),
+        ('DELETE', task_url(1)),
+        ('GET', STATS_URL),
+    ])
+    def test_requires_auth(self, client, method, url):
+        """Test that API endpoints reject anonymous requests"""
+        response = client.open(url, method=method, json={'title': 'Updated'})
+
+        assert response.status_code == 401
+        data = response.get_json()
+        assert 'error' in data
+
+    @pytest.mark.parametrize('method', ['GET', 'PUT', 'DELETE'])
+    def test_nonexistent_task(self, authenticated_client, method):
+        """Test that task endpoints return 404 for a non-existent task"""
+        response = authenticated_client.open(task_url(9999), method=method, json={'title': 'Updated'})
+
+        assert response.status_code == 404
+
 
 # ============================================================================
 # CREATE TASK TESTS
@@ -202,78 +625,109 @@ class TestAuthentication:
 class TestCreateTask:
     """Test cases for creating tasks"""
 
-    def test_create_task_success(self, authenticated_client, sample_task_data, app):
+    def test_create_task_success(self, authenticated_client):
         """Test successful task creation"""
-        response = authenticated_client.post('/api/tasks',
-            data=json.dumps(sample_task_data),
-            content_type='application/json'
-        )
+        response = post_task(authenticated_client)
 
         assert response.status_code == 201
-        data = json.loads(response.data)
-        assert data['title'] == sample_task_data['title']
-        assert data['description'] == sample_task_data['description']
-        assert data['status'] == sample_task_data['status']
-        assert data['priority'] == sample_task_data['priority']
-        assert 'id' in data
+        data = response.get_json()
+        assert data['title'] == _BASE_TASK['title']
+        assert data['description'] == _BASE_TASK['description']
+        assert data['status'] == _BASE_TASK['status']
+        assert data['priority'] == _BASE_TASK['priority']
+        assert data['due_date'] == _BASE_TASK['due_date']
+        assert response.headers['Location'] == task_url(data['id'])
 
         # Verify in database
-        with app.app_context():
-            task = Task.query.filter_by(title='Test Task').first()
-            assert task is not None
-
-    def test_create_task_without_auth(self, client, sample_task_data):
-        """Test task creation without authentication"""
-        response = client.post('/api/tasks',
-            data=json.dumps(sample_task_data),
-            content_type='application/json'
-        )
-
-        assert response.status_code == 401
-        data = json.loads(response.data)
-        assert 'error' in data
+        task = db.session.get(Task, data['id'])
+        assert task is not None
+        assert task.title == _BASE_TASK['title']
 
     def test_create_task_missing_title(self, authenticated_client):
         """Test task creation with missing title"""
-        response = authenticated_client.post('/api/tasks',
-            data=json.dumps({
+        response = authenticated_client.post(TASKS_URL,
+            json={
                 'description': 'Task without title'
-            }),
-            content_type='application/json'
+            }
         )
 
         assert response.status_code == 400
-        data = json.loads(response.data)
+        data = response.get_json()
         assert 'title' in data['error'].lower()
 
-    def test_create_task_with_category(self, authenticated_client, sample_category):
-        """Test task creation with category"""
-        task_data = {
-            'title': 'Task with Category',
-            'description': 'This task has a category',
-            'status': 'pending',
-            'priority': 'medium',
-            'category_id': sample_category
-        }
+    @pytest.mark.parametrize('due_date', ['07/15/2024', '20240715', '2024-W29-1', '2024-07-15T00:00', 20240715])
+    def test_create_task_invalid_due_date(self, authenticated_client, due_date):
+        """Test task creation with a due date that is not YYYY-MM-DD"""
+        response = authenticated_client.post(TASKS_URL, json={'title': 'Bad Date', 'due_date': due_date})
+
+        assert response.status_code == 400
+        data = response.get_json()
+        assert 'date' in data['error'].lower()
 
-        response = authenticated_client.post('/api/tasks',
-            data=json.dumps(task_data),
-            content_type='application/json'
+    def test_create_task_with_category(self, authenticated_client, task_factory, sample_category):
+        """Test task creation with category"""
+        task_data = task_factory(
+            title='Task with Category',
+            description='This task has a category',
+            priority='medium',
+            category_id=sample_category
         )
 
+        response = post_task(authenticated_client, **task_data)
+
         assert response.status_code == 201
-        data = json.loads(response.data)
+        data = response.get_json()
         assert data['category_id'] == sample_category
 
-    def test_create_task_minimal_data(self, authenticated_client, app):
-        """Test task creation with only required fields"""
-        response = authenticated_client.post('/api/tasks',
-            data=json.dumps({'title': 'Minimal Task'}),
-            content_type='application/json'
+    def test_bulk_create_tasks(self, authenticated_client, task_factory):
+        """Test creating several tasks in one request"""
+        tasks = [task_factory(title='Bulk 1'), task_factory(title='Bulk 2', priority='low')]
+        response = authenticated_client.post(TASKS_BULK_URL, json={'tasks': tasks})
+
+        assert response.status_code == 201
+        data = response.get_json()
+        assert [task['title'] for task in data] == ['Bulk 1', 'Bulk 2']
+        assert data[1]['priority'] == 'low'
+        assert len(authenticated_client.get(TASKS_URL).get_json()) == 2
+
+    def test_bulk_create_statement_count(self, authenticated_client, sample_category):
+        """Test that a bulk create does not reload each task after committing"""
+        # Match the application's session, which expires objects on commit
+        db.session().expire_on_commit = True
+        statements = []
+
+        def count_statement(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        tasks = [{'title': f'Bulk {i}', 'category_id': sample_category} for i in range(50)]
+        event.listen(db.engine, 'before_cursor_execute', count_statement)
+        try:
+            response = authenticated_client.post(TASKS_BULK_URL, json={'tasks': tasks})
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count_statement)
+
+        assert response.status_code == 201
+        assert all(task['category_name'] == 'Work' for task in response.get_json())
+        # SQLite inserts the rows one by one; the only read is the shared category
+        selects = [statement for statement in statements if statement.lstrip().upper().startswith('SELECT')]
+        assert len(selects) == 1
+
+    def test_bulk_create_rejects_invalid_task(self, authenticated_client):
+        """Test that one invalid task fails the whole batch"""
+        response = authenticated_client.post(TASKS_BULK_URL,
+            json={'tasks': [{'title': 'Valid'}, {'description': 'No title'}]}
         )
 
+        assert response.status_code == 400
+        assert 'Task 1' in response.get_json()['error']
+        assert authenticated_client.get(TASKS_URL).get_json() == []
+
+    def test_create_task_minimal_data(self, authenticated_client):
+        """Test task creation with only required fields"""
+        response = authenticated_client.post(TASKS_URL, json={'title': 'Minimal Task'})
+
         assert response.status_code == 201
-        data = json.loads(response.data)
+        data = response.get_json()
         assert data['title'] == 'Minimal Task'
         assert data['status'] == 'pending'  # Default status
         assert data['priority'] == 'medium'  # Default priority
@@ -288,111 +742,172 @@ class TestRetrieveTasks:
 
     def test_get_all_tasks_empty(self, authenticated_client):
         """Test retrieving tasks when none exist"""
-        response = authenticated_client.get('/api/tasks')
+        response = authenticated_client.get(TASKS_URL)
 
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = response.get_json()
         assert isinstance(data, list)
         assert len(data) == 0
 
-    def test_get_all_tasks(self, authenticated_client, sample_task_data, app):
+    def test_get_all_tasks(self, authenticated_client, seed_tasks):
         """Test retrieving all tasks"""
-        # Create multiple tasks
-        for i in range(3):
-            task_data = sample_task_data.copy()
-            task_data['title'] = f'Task {i+1}'
-            authenticated_client.post('/api/tasks',
-                data=json.dumps(task_data),
-                content_type='application/json'
-            )
+        seed_tasks(3)
 
-        response = authenticated_client.get('/api/tasks')
+        response = authenticated_client.get(TASKS_URL)
 
         assert response.status_code == 200
-        data = json.loads(response.data)
+        # Short lists are fetched and sent in one piece
+        assert 'Content-Length' in response.headers
+        data = response.get_json()
         assert len(data) == 3
 
-    def test_get_tasks_without_auth(self, client):
-        """Test retrieving tasks without authentication"""
-        response = client.get('/api/tasks')
+    def test_get_tasks_includes_category(self, authenticated_client, seed_tasks, sample_category):
+        """Test that listed tasks carry their category name and color"""
+        seed_tasks(1, category_id=sample_category)
 
-        assert response.status_code == 401
+        response = authenticated_client.get(TASKS_URL)
 
-    def test_get_task_by_id(self, authenticated_client, sample_task_data):
-        """Test retrieving a specific task by ID"""
-        # Create a task
-        create_response = authenticated_client.post('/api/tasks',
-            data=json.dumps(sample_task_data),
-            content_type='application/json'
-        )
-        task_id = json.loads(create_response.data)['id']
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data[0]['category_name'] == 'Work'
+        assert data[0]['category_color'] == '#0d6efd'
+
+    def test_get_tasks_paginated(self, authenticated_client, seed_tasks):
+        """Test paging through tasks with a keyset cursor"""
+        seed_tasks(5)
 
-        # Get the task
-        response = authenticated_client.get(f'/api/tasks/{task_id}')
+        response = authenticated_client.get(TASKS_URL, query_string={'limit': 3})
 
         assert response.status_code == 200
-        data = json.loads(response.data)
-        assert data['id'] == task_id
-        assert data['title'] == sample_task_data['title']
+        data = response.get_json()
+        assert [task['title'] for task in data['items']] == ['Task 5', 'Task 4', 'Task 3']
+        assert data['next_cursor'] is not None
 
-    def test_get_nonexistent_task(self, authenticated_client):
-        """Test retrieving a non-existent task"""
-        response = authenticated_client.get('/api/tasks/9999')
+        response = authenticated_client.get(TASKS_URL, query_string={'limit': 3, 'before': data['next_cursor']})
 
-        assert response.status_code == 404
+        assert response.status_code == 200
+        data = response.get_json()
+        assert [task['title'] for task in data['items']] == ['Task 2', 'Task 1']
+        assert data['next_cursor'] is None
 
-    def test_filter_tasks_by_status(self, authenticated_client, sample_task_data):
-        """Test filtering tasks by status"""
-        # Create tasks with different statuses
-        for status in ['pending', 'in-progress', 'completed']:
-            task_data = sample_task_data.copy()
-            task_data['status'] = status
-            task_data['title'] = f'Task - {status}'
-            authenticated_client.post('/api/tasks',
-                data=json.dumps(task_data),
-                content_type='application/json'
-            )
+    @pytest.mark.parametrize('limit', ['abc', '', '0', '-1'])
+    def test_get_tasks_invalid_limit(self, authenticated_client, limit):
+        """Test paging with a limit that is not a positive integer"""
+        response = authenticated_client.get(TASKS_URL, query_string={'limit': limit})
 
-        response = authenticated_client.get('/api/tasks?status=pending')
+        assert response.status_code == 400
+
+    def test_get_tasks_invalid_cursor(self, authenticated_client):
+        """Test paging with a malformed cursor"""
+        response = authenticated_client.get(TASKS_URL, query_string={'before': 'not-a-cursor'})
+
+        assert response.status_code == 400
+
+    def test_get_tasks_streams_large_list(self, authenticated_client, seed_tasks):
+        """Test that a list spanning several stream batches is valid JSON"""
+        seed_tasks(STREAM_MIN_ROWS + 150)
+
+        response = authenticated_client.get(TASKS_URL)
 
         assert response.status_code == 200
-        data = json.loads(response.data)
-        assert all(task['status'] == 'pending' for task in data)
-
-    def test_filter_tasks_by_priority(self, authenticated_client, sample_task_data):
-        """Test filtering tasks by priority"""
-        # Create tasks with different priorities
-        for priority in ['low', 'medium', 'high']:
-            task_data = sample_task_data.copy()
-            task_data['priority'] = priority
-            task_data['title'] = f'Task - {priority}'
-            authenticated_client.post('/api/tasks',
-                data=json.dumps(task_data),
-                content_type='application/json'
-            )
-
-        response = authenticated_client.get('/api/tasks?priority=high')
+        assert 'Content-Length' not in response.headers
+        data = response.get_json()
+        assert len(data) == STREAM_MIN_ROWS + 150
+        # Streamed rows use the same key order as jsonify'd short lists
+        assert list(data[0]) == sorted(data[0])
+
+    def test_get_task_by_id(self, authenticated_client, sample_task_id):
+        """Test retrieving a specific task by ID"""
+        response = authenticated_client.get(task_url(sample_task_id))
 
         assert response.status_code == 200
-        data = json.loads(response.data)
-        assert all(task['priority'] == 'high' for task in data)
+        data = response.get_json()
+        assert data['id'] == sample_task_id
+        assert data['title'] == _BASE_TASK['title']
+
+    @pytest.mark.parametrize('param,value', [
+        ('status', 'pending'),
+        ('status', 'completed'),
+        ('priority', 'high'),
+        ('priority', 'low'),
+    ])
+    def test_filter_tasks(self, authenticated_client, filter_corpus, param, value):
+        """Test filtering tasks by status and priority"""
+        # Fail on a broken corpus before blaming the filter
+        assert db.session.scalar(select(func.count(Task.id))) == 9
+
+        response = authenticated_client.get(TASKS_URL, query_string={param: value})
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert len(data) == 3
+        assert all(task[param] == value for task in data)
 
-    def test_search_tasks(self, authenticated_client, sample_task_data):
+    def test_search_tasks(self, authenticated_client, seed_tasks):
         """Test searching tasks"""
-        task_data = sample_task_data.copy()
-        task_data['title'] = 'Unique Search Term Task'
-        authenticated_client.post('/api/tasks',
-            data=json.dumps(task_data),
-            content_type='application/json'
-        )
+        seed_tasks(1, title='Unique Search Term Task')
 
-        response = authenticated_client.get('/api/tasks?search=Unique')
+        response = authenticated_client.get(TASKS_URL, query_string={'search': 'Unique'})
 
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = response.get_json()
         assert len(data) >= 1
         assert 'Unique' in data[0]['title']
 
+    def test_search_matches_word_prefixes(self, authenticated_client, seed_tasks):
+        """Test that search matches the start of a word but not its middle"""
+        seed_tasks(1, title='Alpha release')
+
+        def search(term):
+            response = authenticated_client.get(TASKS_URL, query_string={'search': term})
+            return [task['title'] for task in response.get_json()]
+
+        assert search('alph') == ['Alpha release']
+        assert search('lph') == []
+
+    def test_search_follows_task_updates(self, authenticated_client, seed_tasks):
+        """Test that renaming a task moves it in the search index"""
+        task_id, = seed_tasks(1, title='Original Quokka')
+
+        authenticated_client.put(task_url(task_id), json={'title': 'Renamed Zephyr'})
+
+        assert authenticated_client.get(TASKS_URL, query_string={'search': 'Quokka'}).get_json() == []
+        data = authenticated_client.get(TASKS_URL, query_string={'search': 'Zephyr'}).get_json()
+        assert [task['id'] for task in data] == [task_id]
+
+    def test_search_index_drops_deleted_tasks(self, authenticated_client, seed_tasks):
+        """Test that deleting a task removes it from the search index"""
+        task_id, = seed_tasks(1, title='Doomed Quokka')
+
+        authenticated_client.delete(task_url(task_id))
+
+        matches = db.session.execute(
+            select(task_fts.c.rowid).where(task_fts.c.task_fts.op('MATCH')('Quokka'))
+        ).all()
+        assert matches == []
+
+    def test_search_index_built_for_existing_database(self, authenticated_client, seed_tasks):
+        """Test that create_all adds and fills the index on a database created without it"""
+        seed_tasks(1, title='Legacy Quokka')
+        connection = db.session.connection()
+        for name in ('task_fts_ai', 'task_fts_ad', 'task_fts_au'):
+            connection.exec_driver_sql(f'DROP TRIGGER {name}')
+        connection.exec_driver_sql('DROP TABLE task_fts')
+
+        db.metadata.create_all(connection)
+
+        data = authenticated_client.get(TASKS_URL, query_string={'search': 'Quokka'}).get_json()
+        assert [task['title'] for task in data] == ['Legacy Quokka']
+
+    def test_search_on_postgresql_uses_search_vector(self):
+        """Test that PostgreSQL search matches the indexed tsvector column"""
+        stmt = select(task_search.c.id).where(search_vector_match('quokka'))
+
+        sql = str(stmt.compile(dialect=postgresql.dialect()))
+
+        assert 'task.search_vector @@ plainto_tsquery(' in sql
+
+
 
 # ============================================================================
 # UPDATE TASK TESTS
@@ -401,14 +916,9 @@ class TestRetrieveTasks:
 class TestUpdateTask:
     """Test cases for updating tasks"""
 
-    def test_update_task_success(self, authenticated_client, sample_task_data, app):
+    def test_update_task_success(self, authenticated_client, sample_task_id):
         """Test successful task update"""
-        # Create a task
-        create_response = authenticated_client.post('/api/tasks',
-            data=json.dumps(sample_task_data),
-            content_type='application/json'
-        )
-        task_id = json.loads(create_response.data)['id']
+        task_id = sample_task_id
 
         # Update the task
         update_data = {
@@ -416,58 +926,28 @@ class TestUpdateTask:
             'status': 'completed',
             'priority': 'low'
         }
-        response = authenticated_client.put(f'/api/tasks/{task_id}',
-            data=json.dumps(update_data),
-            content_type='application/json'
-        )
+        response = authenticated_client.put(task_url(task_id), json=update_data)
 
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = response.get_json()
         assert data['title'] == 'Updated Task Title'
         assert data['status'] == 'completed'
         assert data['priority'] == 'low'
 
         # Verify in database
-        with app.app_context():
-            task = Task.query.get(task_id)
-            assert task.title == 'Updated Task Title'
-
-    def test_update_task_without_auth(self, client):
-        """Test updating task without authentication"""
-        response = client.put('/api/tasks/1',
-            data=json.dumps({'title': 'Updated'}),
-            content_type='application/json'
-        )
-
-        assert response.status_code == 401
+        task = db.session.get(Task, task_id)
+        assert task.title == 'Updated Task Title'
 
-    def test_update_nonexistent_task(self, authenticated_client):
-        """Test updating a non-existent task"""
-        response = authenticated_client.put('/api/tasks/9999',
-            data=json.dumps({'title': 'Updated'}),
-            content_type='application/json'
-        )
-
-        assert response.status_code == 404
-
-    def test_update_task_partial(self, authenticated_client, sample_task_data):
+    def test_update_task_partial(self, authenticated_client, sample_task_id):
         """Test partial task update"""
-        # Create a task
-        create_response = authenticated_client.post('/api/tasks',
-            data=json.dumps(sample_task_data),
-            content_type='application/json'
-        )
-        task_id = json.loads(create_response.data)['id']
-        original_description = sample_task_data['description']
+        task_id = sample_task_id
+        original_description = _BASE_TASK['description']
 
         # Update only the status
-        response = authenticated_client.put(f'/api/tasks/{task_id}',
-            data=json.dumps({'status': 'completed'}),
-            content_type='application/json'
-        )
+        response = authenticated_client.put(task_url(task_id), json={'status': 'completed'})
 
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = response.get_json()
         assert data['status'] == 'completed'
         assert data['description'] == original_description
 
@@ -479,83 +959,33 @@ class TestUpdateTask:
 class TestDeleteTask:
     """Test cases for deleting tasks"""
 
-    def test_delete_task_success(self, authenticated_client, sample_task_data, app):
+    def test_delete_task_success(self, authenticated_client, sample_task_id):
         """Test successful task deletion"""
-        # Create a task
-        create_response = authenticated_client.post('/api/tasks',
-            data=json.dumps(sample_task_data),
-            content_type='application/json'
-        )
-        task_id = json.loads(create_response.data)['id']
+        task_id = sample_task_id
 
         # Delete the task
-        response = authenticated_client.delete(f'/api/tasks/{task_id}')
+        response = authenticated_client.delete(task_url(task_id))
 
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = response.get_json()
         assert data['message'] == 'Task deleted successfully'
 
         # Verify deletion
-        with app.app_context():
-            task = Task.query.get(task_id)
-            assert task is None
+        assert db.session.get(Task, task_id) is None
 
-    def test_delete_task_without_auth(self, client):
-        """Test deleting task without authentication"""
-        response = client.delete('/api/tasks/1')
-
-        assert response.status_code == 401
-
-    def test_delete_nonexistent_task(self, authenticated_client):
-        """Test deleting a non-existent task"""
-        response = authenticated_client.delete('/api/tasks/9999')
-
-        assert response.status_code == 404
-
-    def test_delete_other_users_task(self, client, app, sample_task_data):
+    def test_delete_other_users_task(self, client, user_factory, login_as):
         """Test that users cannot delete other users' tasks"""
-        # Create first user and task
-        with app.app_context():
-            user1 = User(username='user1', email='user1@test.com')
-            user1.set_password('password123')
-            db.session.add(user1)
-            db.session.commit()
+        user1, user2 = user_factory('user1'), user_factory('user2')
 
         # Login as user1 and create task
-        client.post('/api/login',
-            data=json.dumps({
-                'username': 'user1',
-                'password': 'password123'
-            }),
-            content_type='application/json'
-        )
+        login_as(client, user1)
+        task_id = post_task(client).get_json()['id']
 
-        create_response = client.post('/api/tasks',
-            data=json.dumps(sample_task_data),
-            content_type='application/json'
-        )
-        task_id = json.loads(create_response.data)['id']
-
-        # Logout
-        client.post('/api/logout')
-
-        # Create and login as user2
-        with app.app_context():
-            user2 = User(username='user2', email='user2@test.com')
-            user2.set_password('password123')
-            db.session.add(user2)
-            db.session.commit()
-
-        client.post('/api/login',
-            data=json.dumps({
-                'username': 'user2',
-                'password': 'password123'
-            }),
-            content_type='application/json'
-        )
+        # Switch to user2
+        login_as(client, user2)
 
         # Try to delete user1's task
-        response = client.delete(f'/api/tasks/{task_id}')
+        response = client.delete(task_url(task_id))
 
         # Should return 404 (not found for this user)
         assert response.status_code == 404
@@ -570,43 +1000,76 @@ class TestDashboardStats:
 
     def test_get_stats_empty(self, authenticated_client):
         """Test getting stats when no tasks exist"""
-        response = authenticated_client.get('/api/stats')
+        response = authenticated_client.get(STATS_URL)
 
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = response.get_json()
         assert data['total_tasks'] == 0
         assert data['completed'] == 0
         assert data['pending'] == 0
+        assert data['overdue'] == 0
+        assert data['high_priority'] == 0
         assert data['completion_rate'] == 0
+        assert data['tasks_by_category'] == []
 
-    def test_get_stats_with_tasks(self, authenticated_client, sample_task_data):
+    def test_get_stats_with_tasks(self, authenticated_client, seed_tasks):
         """Test getting stats with tasks"""
-        # Create tasks with different statuses
-        statuses = ['pending', 'in-progress', 'completed', 'completed']
-        for i, status in enumerate(statuses):
-            task_data = sample_task_data.copy()
-            task_data['status'] = status
-            task_data['title'] = f'Task {i+1}'
-            authenticated_client.post('/api/tasks',
-                data=json.dumps(task_data),
-                content_type='application/json'
-            )
-
-        response = authenticated_client.get('/api/stats')
+        seed_tasks(4, status=['pending', 'in-progress', 'completed', 'completed'])
+
+        response = authenticated_client.get(STATS_URL)
 
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = response.get_json()
         assert data['total_tasks'] == 4
         assert data['completed'] == 2
         assert data['pending'] == 1
         assert data['in_progress'] == 1
         assert data['completion_rate'] == 50.0
 
-    def test_stats_without_auth(self, client):
-        """Test getting stats without authentication"""
-        response = client.get('/api/stats')
+    def test_get_stats_overdue_and_high_priority(self, authenticated_client, seed_tasks):
+        """Test that overdue skips completed tasks and high priority counts only pending ones"""
+        past = datetime.utcnow() - timedelta(days=1)
+        future = datetime.utcnow() + timedelta(days=1)
+        seed_tasks(
+            5,
+            status=['pending', 'completed', 'in-progress', 'pending', 'in-progress'],
+            priority=['high', 'high', 'low', 'high', 'high'],
+            due_date=[past, past, past, future, None]
+        )
 
-        assert response.status_code == 401
+        response = authenticated_client.get(STATS_URL)
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['overdue'] == 2
+        assert data['high_priority'] == 2
+
+    def test_get_stats_tasks_by_category(self, authenticated_client, seed_tasks, sample_category, auth_user):
+        """Test per-category counts, leaving out empty categories and uncategorized tasks"""
+        db.session.execute(insert(Category).values(name='Empty', color='#000000', user_id=auth_user))
+        seed_tasks(2, category_id=sample_category)
+        seed_tasks(1)
+
+        response = authenticated_client.get(STATS_URL)
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['tasks_by_category'] == [{'name': 'Work', 'count': 2, 'color': '#0d6efd'}]
+
+    def test_stats_cache_invalidated_on_write(self, app, authenticated_client, monkeypatch):
+        """Test that cached stats are dropped when tasks change"""
+        cache = FakeRedis()
+        monkeypatch.setitem(app.extensions, 'redis', cache)
+
+        response = authenticated_client.get(STATS_URL)
+        assert response.get_json()['total_tasks'] == 0
+        assert len(cache) == 1
+
+        post_task(authenticated_client)
+        assert len(cache) == 0
+
+        response = authenticated_client.get(STATS_URL)
+        assert response.get_json()['total_tasks'] == 1
 
 
 # ============================================================================
@@ -616,64 +1079,65 @@ class TestDashboardStats:
 class TestCategories:
     """Test cases for category management"""
 
-    def test_get_categories(self, authenticated_client, app, auth_user):
+    def test_get_categories(self, authenticated_client):
         """Test retrieving categories"""
-        response = authenticated_client.get('/api/categories')
+        response = authenticated_client.get(CATEGORIES_URL)
 
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = response.get_json()
         assert isinstance(data, list)
         # Categories list should be accessible (may be empty if user was created manually)
         assert len(data) >= 0
 
-    def test_get_categories_after_registration(self, client, app):
+    def test_get_categories_task_count(self, authenticated_client, seed_tasks, sample_category):
+        """Test that categories report how many tasks they hold"""
+        seed_tasks(2, category_id=sample_category)
+
+        response = authenticated_client.get(CATEGORIES_URL)
+
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data == [{'id': sample_category, 'name': 'Work', 'color': '#0d6efd', 'task_count': 2}]
+
+    def test_get_categories_after_registration(self, client):
         """Test that registration creates default categories"""
         # Register a new user (which creates default categories)
         client.post('/api/register',
-            data=json.dumps({
+            json={
                 'username': 'categoryuser',
                 'email': 'category@test.com',
                 'password': 'password123'
-            }),
-            content_type='application/json'
+            }
         )
 
         # Get categories
-        response = client.get('/api/categories')
+        response = client.get(CATEGORIES_URL)
 
         assert response.status_code == 200
-        data = json.loads(response.data)
-        # Should have 4 default categories from registration
-        assert len(data) == 4
-        category_names = [cat['name'] for cat in data]
-        assert 'Work' in category_names
-        assert 'Personal' in category_names
-        assert 'Shopping' in category_names
-        assert 'Health' in category_names
-
-    def test_create_category(self, authenticated_client, app):
+        data = response.get_json()
+        # Should have the default categories from registration
+        assert [(cat['name'], cat['color']) for cat in data] == DEFAULT_CATEGORIES
+
+    def test_create_category(self, authenticated_client):
         """Test creating a custom category"""
         category_data = {
             'name': 'Custom Category',
             'color': '#ff5733'
         }
 
-        response = authenticated_client.post('/api/categories',
-            data=json.dumps(category_data),
-            content_type='application/json'
-        )
+        response = authenticated_client.post(CATEGORIES_URL, json=category_data)
 
         assert response.status_code == 201
-        data = json.loads(response.data)
+        data = response.get_json()
         assert data['name'] == 'Custom Category'
         assert data['color'] == '#ff5733'
 
     def test_delete_category(self, authenticated_client, sample_category):
         """Test deleting a category"""
-        response = authenticated_client.delete(f'/api/categories/{sample_category}')
+        response = authenticated_client.delete(category_url(sample_category))
 
         assert response.status_code == 200
-        data = json.loads(response.data)
+        data = response.get_json()
         assert data['message'] == 'Category deleted successfully'
 
 
@@ -684,68 +1148,70 @@ class TestCategories:
 class TestIntegration:
     """Integration tests for complete workflows"""
 
-    def test_complete_task_lifecycle(self, authenticated_client, sample_task_data, app):
+    @pytest.mark.slow
+    def test_complete_task_lifecycle(self, authenticated_client):
         """Test complete CRUD workflow"""
         # 1. Create task
-        create_response = authenticated_client.post('/api/tasks',
-            data=json.dumps(sample_task_data),
-            content_type='application/json'
-        )
+        create_response = post_task(authenticated_client)
         assert create_response.status_code == 201
-        task_id = json.loads(create_response.data)['id']
+        location = create_response.headers['Location']
+        task_id = create_response.get_json()['id']
 
         # 2. Read task
-        read_response = authenticated_client.get(f'/api/tasks/{task_id}')
+        read_response = authenticated_client.get(location)
         assert read_response.status_code == 200
 
         # 3. Update task
-        update_response = authenticated_client.put(f'/api/tasks/{task_id}',
-            data=json.dumps({'status': 'completed'}),
-            content_type='application/json'
-        )
+        update_response = authenticated_client.put(task_url(task_id), json={'status': 'completed'})
         assert update_response.status_code == 200
 
         # 4. Delete task
-        delete_response = authenticated_client.delete(f'/api/tasks/{task_id}')
+        delete_response = authenticated_client.delete(task_url(task_id))
         assert delete_response.status_code == 200
 
         # 5. Verify deletion
-        final_response = authenticated_client.get(f'/api/tasks/{task_id}')
-        assert final_response.status_code == 404
+        assert db.session.get(Task, task_id) is None
 
-    def test_user_isolation(self, client, app, sample_task_data):
+    def test_user_isolation(self, client, user_factory, login_as):
         """Test that users can only see their own tasks"""
-        # Create two users
-        with app.app_context():
-            user1 = User(username='user1', email='user1@test.com')
-            user1.set_password('pass123')
-            user2 = User(username='user2', email='user2@test.com')
-            user2.set_password('pass123')
-            db.session.add_all([user1, user2])
-            db.session.commit()
+        user1, user2 = user_factory('user1'), user_factory('user2')
 
         # User1 creates tasks
-        client.post('/api/login',
-            data=json.dumps({'username': 'user1', 'password': 'pass123'}),
-            content_type='application/json'
-        )
-        client.post('/api/tasks',
-            data=json.dumps(sample_task_data),
-            content_type='application/json'
-        )
-        client.post('/api/logout')
+        login_as(client, user1)
+        response = client.post(TASKS_BULK_URL, json={'tasks': [{'title': 'Task 1'}, {'title': 'Task 2'}]})
+        assert response.status_code == 201
 
-        # User2 logs in and checks tasks
-        client.post('/api/login',
-            data=json.dumps({'username': 'user2', 'password': 'pass123'}),
-            content_type='application/json'
-        )
-        response = client.get('/api/tasks')
-        data = json.loads(response.data)
+        # User2 checks tasks
+        login_as(client, user2)
+        response = client.get(TASKS_URL)
+        data = response.get_json()
 
         # User2 should see 0 tasks
         assert len(data) == 0
 
+    def test_routes_registered_once(self, app):
+        """Test that no URL rule is registered twice"""
+        rules = [(rule.rule, tuple(sorted(rule.methods))) for rule in app.url_map.iter_rules()]
+        assert len(rules) == len(set(rules))
+
+    def test_create_app_with_in_memory_sqlite(self):
+        """Test that the default engine options work with an in-memory SQLite URL"""
+        memory_app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'REDIS_URL': None})
+
+        assert 'pool_size' not in memory_app.config['SQLALCHEMY_ENGINE_OPTIONS']
+        with memory_app.app_context():
+            with db.engine.connect() as connection:
+                assert connection.exec_driver_sql('SELECT 1').scalar() == 1
+
+    @pytest.mark.parametrize('url', ['postgres://u:p@localhost/tasks', 'postgresql://u:p@localhost/tasks'])
+    def test_create_app_pins_postgresql_to_psycopg2(self, url):
+        """Test that a bare PostgreSQL URL uses psycopg2, the driver gunicorn patches for gevent"""
+        pytest.importorskip('psycopg2')
+        pg_app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': url, 'REDIS_URL': None})
+
+        assert pg_app.config['SQLALCHEMY_DATABASE_URI'] == 'postgresql+psycopg2://u:p@localhost/tasks'
+        assert pg_app.config['SQLALCHEMY_ENGINE_OPTIONS']['pool_size'] == 20
+
 
 if __name__ == '__main__':
-    pytest.main([__file__, '-v'])
\ No newline at end of file
+    pytest.main([__file__, '-v'])